@@ -3,118 +3,118 @@
 Analyze Ethereum spec test results to identify patterns in failures.
 """
 
+import mmap
+import os
 import re
+import stat
 import sys
 from collections import defaultdict
 from pathlib import Path
 
+# Zig test output format: "test.test_name...OK" or "test.test_name...FAIL"
+# e.g. "test.ethereum_tests.stExample.test_name...OK"
+TEST_RE = re.compile(rb'test\.(\S+?)\.\.\.(OK|FAIL)\b')
+
 def analyze_test_results(log_file):
     """Parse test results and categorize failures."""
 
-    with open(log_file, 'r') as f:
-        content = f.read()
-
-    # Extract test results
-    # Zig test output format: "test.test_name...OK" or "test.test_name...FAIL"
-
-    passed = []
-    failed = []
-
-    # Pattern for test results
-    # Looking for lines like: "test.ethereum_tests.stExample.test_name...OK"
-    test_pattern = r'test\.([^\s]+)\.\.\.(?:OK|FAIL)'
-
-    for match in re.finditer(test_pattern, content):
-        test_name = match.group(1)
-        status = match.group(0).split('...')[-1]
-
-        if status == 'OK':
-            passed.append(test_name)
+    # Extract and categorize test results in a single pass; each category
+    # holds [passed, failed] counts.
+    categories = defaultdict(lambda: [0, 0])
+    total_passed = 0
+    total_failed = 0
+
+    # Scan the log through a read-only mapping so multi-GB logs are never
+    # copied or decoded as a whole; only category names are decoded.
+    with open(log_file, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            # Pipes, FIFOs and /dev/stdin cannot be mapped and report a size of 0
+            results = TEST_RE.findall(f.read())
+        elif st.st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                results = TEST_RE.findall(content)
         else:
-            failed.append(test_name)
-
-    # Categorize by test type
-    categories = defaultdict(lambda: {'passed': 0, 'failed': 0})
-
-    for test in passed:
-        category = extract_category(test)
-        categories[category]['passed'] += 1
+            results = []
+
+    raw_categories = defaultdict(lambda: [0, 0])
+    for test_name, status in results:
+        # Category is the second dotted part of the test name, e.g.
+        # "ethereum_tests.stExample.test_add" -> "stExample"
+        _, sep, rest = test_name.partition(b'.')
+        counts = raw_categories[rest.partition(b'.')[0] if sep else b'unknown']
+        if status == b'OK':
+            counts[0] += 1
+            total_passed += 1
+        else:
+            counts[1] += 1
+            total_failed += 1
 
-    for test in failed:
-        category = extract_category(test)
-        categories[category]['failed'] += 1
+    for raw_category, counts in raw_categories.items():
+        category = categories[raw_category.decode('utf-8', 'replace')]
+        category[0] += counts[0]
+        category[1] += counts[1]
 
-    # Print summary
-    print("=" * 80)
-    print("ETHEREUM SPEC TEST RESULTS SUMMARY")
-    print("=" * 80)
-    print()
+    # Build the summary and write it in one go
+    lines = []
+    lines.append("=" * 80)
+    lines.append("ETHEREUM SPEC TEST RESULTS SUMMARY")
+    lines.append("=" * 80)
+    lines.append("")
 
-    total_passed = len(passed)
-    total_failed = len(failed)
     total_tests = total_passed + total_failed
 
-    print(f"Total Tests: {total_tests}")
-    print(f"Passed: {total_passed} ({100 * total_passed / total_tests if total_tests > 0 else 0:.1f}%)")
-    print(f"Failed: {total_failed} ({100 * total_failed / total_tests if total_tests > 0 else 0:.1f}%)")
-    print()
+    lines.append(f"Total Tests: {total_tests}")
+    lines.append(f"Passed: {total_passed} ({100 * total_passed / total_tests if total_tests > 0 else 0:.1f}%)")
+    lines.append(f"Failed: {total_failed} ({100 * total_failed / total_tests if total_tests > 0 else 0:.1f}%)")
+    lines.append("")
 
-    print("=" * 80)
-    print("BREAKDOWN BY CATEGORY")
-    print("=" * 80)
-    print()
+    lines.append("=" * 80)
+    lines.append("BREAKDOWN BY CATEGORY")
+    lines.append("=" * 80)
+    lines.append("")
 
     # Sort by total tests
     sorted_categories = sorted(
         categories.items(),
-        key=lambda x: x[1]['passed'] + x[1]['failed'],
+        key=lambda x: x[1][0] + x[1][1],
         reverse=True
     )
 
-    for category, counts in sorted_categories:
-        total = counts['passed'] + counts['failed']
-        pass_rate = 100 * counts['passed'] / total if total > 0 else 0
+    for category, (cat_passed, cat_failed) in sorted_categories:
+        total = cat_passed + cat_failed
+        pass_rate = 100 * cat_passed / total if total > 0 else 0
 
-        print(f"{category:40} {counts['passed']:4}/{total:4} ({pass_rate:5.1f}%)")
+        lines.append(f"{category:40} {cat_passed:4}/{total:4} ({pass_rate:5.1f}%)")
 
-    print()
-    print("=" * 80)
-    print("TOP FAILING CATEGORIES (by count)")
-    print("=" * 80)
-    print()
+    lines.append("")
+    lines.append("=" * 80)
+    lines.append("TOP FAILING CATEGORIES (by count)")
+    lines.append("=" * 80)
+    lines.append("")
 
     sorted_by_failures = sorted(
         categories.items(),
-        key=lambda x: x[1]['failed'],
+        key=lambda x: x[1][1],
         reverse=True
     )
 
-    for category, counts in sorted_by_failures[:20]:
-        if counts['failed'] > 0:
-            print(f"{category:40} {counts['failed']:4} failures")
+    for category, (_, cat_failed) in sorted_by_failures[:20]:
+        if cat_failed > 0:
+            lines.append(f"{category:40} {cat_failed:4} failures")
+
+    sys.stdout.write("\n".join(lines) + "\n")
 
     return {
         'total': total_tests,
         'passed': total_passed,
         'failed': total_failed,
-        'categories': dict(categories)
+        'categories': {
+            category: {'passed': cat_passed, 'failed': cat_failed}
+            for category, (cat_passed, cat_failed) in categories.items()
+        }
     }
 
-def extract_category(test_name):
-    """Extract category from test name."""
-
-    # test_name format examples:
-    # - "ethereum_tests.stExample.test_add"
-    # - "execution-specs.arithmetic.test_mul"
-
-    parts = test_name.split('.')
-
-    if len(parts) >= 2:
-        # Use second part as category (e.g., "stExample" or "arithmetic")
-        return parts[1]
-
-    return 'unknown'
-
 if __name__ == '__main__':
     if len(sys.argv) > 1:
         log_file = sys.argv[1]
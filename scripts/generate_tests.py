@@ -10,152 +10,422 @@ Each JSON file containing test cases becomes ONE Zig file with ONE test function
 """
 
 import os
+import hashlib
 import json
+import multiprocessing
+import re
+import shutil
 import sys
 import tarfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    # orjson parses straight from bytes and is several times faster on large fixtures
+    from orjson import loads as json_loads
+except ImportError:
+    # Share one decoder across fixtures and decode bytes directly, skipping
+    # json.loads' per-call encoding detection
+    JSON_DECODER = json.JSONDecoder()
+
+    def json_loads(raw: bytes):
+        return JSON_DECODER.decode(raw.decode("utf-8-sig"))
+
+# Generated Zig files are the header followed by one test block per test case;
+# each block starts with the blank line that separates it from the previous one.
+ZIG_HEADER_TEMPLATE = """\
+const std = @import("std");
+const testing = std.testing;
+const root = @import("{root_import}");
+const runner = root.runner;
+"""
+
+ZIG_TEST_TEMPLATE = """
+test "{unique_test_name}" {{
+    const allocator = testing.allocator;
+
+    // Read and parse the JSON test file
+    const json_path = "{json_path}";
+    const json_content = try std.fs.cwd().readFileAlloc(allocator, json_path, 100 * 1024 * 1024);
+    defer allocator.free(json_content);
+
+    const parsed = try std.json.parseFromSlice(std.json.Value, allocator, json_content, .{{}});
+    defer parsed.deinit();
+
+    // Get the specific test case
+    const test_case = parsed.value.object.get("{test_name}") orelse return error.TestNotFound;
+
+    // Run the test with path for trace generation
+    try runner.runJsonTestWithPath(allocator, test_case, json_path);
+}}
+"""
+
+# Stand-in for a fixture whose content is identical to one already generated
+ZIG_DUPLICATE_TEMPLATE = """\
+// Same content as the fixture behind {canonical}; its tests are generated there
+test {{
+    _ = @import("{import_path}");
+}}
+"""
+
+# Escapes for interpolating arbitrary text into Zig string literals
+ZIG_STRING_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    '"': '\\"',
+    "\n": "\\n",
+    "\r": "\\r",
+    "\t": "\\t",
+    **{chr(c): f"\\x{c:02x}" for c in [*range(0x20), 0x7F] if chr(c) not in "\n\r\t"},
+})
+
+SANITIZE_RE = re.compile(r"[\W_]+")
+
+# Records fixture stamps so unchanged fixtures are skipped on the next run
+MANIFEST_NAME = ".gen_cache.json"
+
+# Written into extracted fixture trees, holding the SHA-256, mtime_ns and size
+# of the source archive
+ARCHIVE_SENTINEL_NAME = ".archive.sha256"
 
 
 def sanitize_test_name(name: str) -> str:
     """Convert test name to valid Zig identifier."""
-    # Replace invalid characters with underscores
-    sanitized = name.replace("-", "_").replace(".", "_").replace(" ", "_")
-    sanitized = sanitized.replace("::", "_").replace("(", "_").replace(")", "_")
-    sanitized = sanitized.replace("[", "_").replace("]", "_").replace(",", "_")
-    # Remove any other special characters
-    sanitized = "".join(c if c.isalnum() or c == "_" else "_" for c in sanitized)
-    # Remove consecutive underscores
-    while "__" in sanitized:
-        sanitized = sanitized.replace("__", "_")
+    # Replace each run of invalid characters and underscores with a single underscore
+    sanitized = SANITIZE_RE.sub("_", name)
     # Ensure it doesn't start with a number
-    if sanitized and sanitized[0].isdigit():
+    if sanitized[:1].isdigit():
         sanitized = "test_" + sanitized
     return sanitized
 
 
+def read_test_names(raw: bytes) -> Optional[List[str]]:
+    """
+    Return the top-level keys (test names) of a JSON fixture, or None if the
+    fixture is not a JSON object.
+    """
+    data = json_loads(raw)
+    return list(data) if isinstance(data, dict) else None
+
+
+def read_file(path: Path) -> bytes:
+    """
+    Read a whole file with raw os.read calls sized from fstat, skipping the
+    buffered I/O layer and the extra read that would only report EOF.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        remaining = os.fstat(fd).st_size
+        chunks = []
+        while remaining > 0:
+            chunk = os.read(fd, remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def write_file(path: Path, payload: bytes) -> None:
+    """Write bytes to path with raw os.write calls, bypassing the text I/O layer."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def file_stamp(path) -> List[int]:
+    """Return [mtime_ns, size] for path, used to detect changed fixtures."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, list]:
+    """
+    Load the manifest of the previous run, mapping each generated file (relative
+    to the output directory) to [mtime_ns, size, digest, test_count] of its
+    fixture, or to [mtime_ns, size, digest, 0, canonical_zig_rel_path] for
+    duplicate fixtures. digest is None for fixtures that were never hashed.
+
+    Returns an empty manifest if there is none, it is unreadable, or it was
+    written by a different version of this script.
+    """
+    try:
+        manifest = json.loads(manifest_path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("generator") != file_stamp(__file__):
+        return {}
+    return manifest.get("fixtures", {})
+
+
+def save_manifest(manifest_path: Path, fixtures: Dict[str, list]) -> None:
+    """Atomically replace the manifest with the given fixture entries."""
+    payload = json.dumps({"generator": file_stamp(__file__), "fixtures": fixtures})
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    write_file(tmp_path, payload.encode("utf-8"))
+    os.replace(tmp_path, manifest_path)
+
+
+def discard_tree(path: Path) -> multiprocessing.Process:
+    """
+    Move a directory tree aside and delete it in a background process, so
+    removing hundreds of thousands of old files does not delay generation.
+    The caller should join() the returned process before exiting.
+    """
+    old_path = path.with_name(path.name + ".old")
+    # Left behind by an interrupted run
+    shutil.rmtree(old_path, ignore_errors=True)
+    os.replace(path, old_path)
+    remover = multiprocessing.Process(target=shutil.rmtree, args=(old_path,))
+    remover.start()
+    return remover
+
+
+def archive_sha256(archive_path: Path) -> str:
+    """Return the hex SHA-256 digest of a fixture archive."""
+    digest = hashlib.sha256()
+    with open(archive_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_archive_sentinel(fixtures_dir: Path, archive_path: Path, digest: Optional[str] = None) -> None:
+    """Record the digest and [mtime_ns, size] of the archive fixtures_dir was extracted from."""
+    mtime_ns, size = file_stamp(archive_path)
+    if digest is None:
+        digest = archive_sha256(archive_path)
+    (fixtures_dir / ARCHIVE_SENTINEL_NAME).write_text(f"{digest} {mtime_ns} {size}\n")
+
+
+def archive_unchanged(fixtures_dir: Path, archive_path: Path) -> bool:
+    """
+    Return False only if fixtures_dir was extracted from archive_path and the
+    archive has changed since; fixtures placed there by other means are kept.
+
+    The archive is only re-hashed if its mtime or size differ from the sentinel.
+    """
+    sentinel_path = fixtures_dir / ARCHIVE_SENTINEL_NAME
+    if not sentinel_path.exists() or not archive_path.exists():
+        return True
+    recorded = sentinel_path.read_text().split()
+    if recorded[1:] == [str(value) for value in file_stamp(archive_path)]:
+        return True
+    digest = archive_sha256(archive_path)
+    if recorded[:1] != [digest]:
+        return False
+    # Same content with a new mtime, e.g. after a fresh checkout
+    write_archive_sentinel(fixtures_dir, archive_path, digest)
+    return True
+
+
+def fixture_digest(json_path: Path) -> Optional[str]:
+    """Return the hex digest of a fixture's content, or None if it cannot be read."""
+    try:
+        return hashlib.blake2b(read_file(json_path), digest_size=16).hexdigest()
+    except OSError:
+        return None
+
+
+def find_duplicate_fixtures(
+    entries: List[Tuple[str, Path, List[int]]], manifest: Dict[str, list]
+) -> Tuple[Dict[str, str], Dict[str, Optional[str]]]:
+    """
+    Map each (zig_rel_path, json_path, stamp) entry whose fixture content is
+    identical to an earlier one (by path order) to that entry's zig_rel_path.
+    Also returns the content digests by zig_rel_path, to be kept in the manifest.
+
+    Only fixtures that share their size with another fixture need a digest;
+    unchanged fixtures reuse the one in the manifest and the rest are hashed
+    across cores.
+    """
+    size_counts = Counter(stamp[1] for _, _, stamp in entries)
+    digests: Dict[str, Optional[str]] = {}
+    to_hash = []
+    for zig_rel_path, json_path, stamp in entries:
+        cached = manifest.get(zig_rel_path)
+        if cached is not None and cached[:2] == stamp and len(cached) > 2 and cached[2] is not None:
+            digests[zig_rel_path] = cached[2]
+        elif size_counts[stamp[1]] > 1:
+            to_hash.append((zig_rel_path, json_path))
+    if to_hash:
+        with ProcessPoolExecutor() as executor:
+            hashed = executor.map(fixture_digest, [json_path for _, json_path in to_hash], chunksize=32)
+            digests.update(zip([zig_rel_path for zig_rel_path, _ in to_hash], hashed))
+
+    duplicates = {}
+    seen: Dict[str, str] = {}
+    for zig_rel_path in sorted(digests):
+        digest = digests[zig_rel_path]
+        if digest is None:
+            continue
+        canonical = seen.setdefault(digest, zig_rel_path)
+        if canonical != zig_rel_path:
+            duplicates[zig_rel_path] = canonical
+    return duplicates, digests
+
+
+def write_duplicate_file(output_dir: Path, zig_rel_path: str, canonical: str) -> None:
+    """Write a Zig file that defers to the tests generated for an identical fixture."""
+    import_path = os.path.relpath(canonical, os.path.dirname(zig_rel_path) or ".")
+    payload = ZIG_DUPLICATE_TEMPLATE.format(
+        canonical=canonical.replace(os.sep, "/"),
+        import_path=import_path.replace(os.sep, "/").translate(ZIG_STRING_ESCAPES),
+    )
+    output_file = output_dir / zig_rel_path
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    write_file(output_file, payload.encode("utf-8"))
+
+
+def output_rel_path(json_rel_path: str, source_name: str) -> str:
+    """Return the path of the generated Zig file relative to the output directory."""
+    # For execution-specs: stRandom/randomStatetest0Filler.json -> stRandom/randomStatetest0Filler.zig
+    # For ethereum-tests: stSelfBalance/selfBalance.json -> ethereum_tests/stSelfBalance/selfBalance.zig
+    zig_rel_path = json_rel_path.replace(".json", ".zig")
+    if source_name == "ethereum_tests":
+        return os.path.join("ethereum_tests", zig_rel_path)
+    return zig_rel_path
+
+
 def generate_test_file(
     json_path: Path,
     output_dir: Path,
     json_rel_path: str,
-    source_name: str
+    source_name: str,
+    depth: int
 ) -> int:
     """
     Generate a Zig test file for a JSON test file.
 
+    depth is the number of path components of the output file below output_dir,
+    including the file itself.
+
     Returns the number of test cases generated.
     """
-    # Read and parse JSON to get test names
+    # Create output file path - preserve directory structure
+    output_file = output_dir / output_rel_path(json_rel_path, source_name)
+
+    # Read and parse JSON to get test names; an invalid fixture gets no output,
+    # including any left over from before it became invalid
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        test_names = read_test_names(read_file(json_path))
     except (json.JSONDecodeError, IOError) as e:
         print(f"Warning: Could not parse {json_path}: {e}", file=sys.stderr)
+        output_file.unlink(missing_ok=True)
         return 0
 
-    if not isinstance(data, dict):
+    if test_names is None:
         print(f"Warning: {json_path} does not contain a test object", file=sys.stderr)
+        output_file.unlink(missing_ok=True)
         return 0
 
-    # Create output file path - preserve directory structure
-    # For execution-specs: stRandom/randomStatetest0Filler.json -> stRandom/randomStatetest0Filler.zig
-    # For ethereum-tests: stSelfBalance/selfBalance.json -> ethereum_tests/stSelfBalance/selfBalance.zig
-    if source_name == "ethereum_tests":
-        output_file = output_dir / "ethereum_tests" / json_rel_path.replace(".json", ".zig")
-    else:
-        output_file = output_dir / json_rel_path.replace(".json", ".zig")
-
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
     # Calculate relative path from generated file back to root.zig
     # The generated file will be at test/specs/generated/...
     # We need to import root.zig from test/specs/
-    depth = len(output_file.relative_to(output_dir).parts)  # includes the file itself
     # Go up to test/specs/generated/, then up once more to test/specs/
     root_import = "../" * depth + "root.zig"
 
     # Generate Zig test code
-    zig_code = ['const std = @import("std");']
-    zig_code.append('const testing = std.testing;')
-    zig_code.append(f'const root = @import("{root_import}");')
-    zig_code.append('const runner = root.runner;')
-    zig_code.append("")
+    zig_code = [ZIG_HEADER_TEMPLATE.format(root_import=root_import)]
+    zig_json_path = json_rel_path.translate(ZIG_STRING_ESCAPES)
 
     test_count = 0
-    used_names: Dict[str, int] = {}  # Track used test names to handle collisions
+    used_names: Set[str] = set()  # Track used test names to handle collisions
+    collisions: Dict[str, int] = {}  # Counter per name seen more than once
 
     # Generate a test for each test case in the JSON file
-    for test_name in data.keys():
+    for test_name in test_names:
         safe_test_name = sanitize_test_name(test_name)
 
         # Handle duplicate test names by appending a counter
         if safe_test_name in used_names:
-            used_names[safe_test_name] += 1
-            unique_test_name = f"{safe_test_name}_{used_names[safe_test_name]}"
+            collisions[safe_test_name] = collisions.get(safe_test_name, 0) + 1
+            unique_test_name = f"{safe_test_name}_{collisions[safe_test_name]}"
         else:
-            used_names[safe_test_name] = 0
+            used_names.add(safe_test_name)
             unique_test_name = safe_test_name
 
-        zig_code.append(f'test "{unique_test_name}" {{')
-        zig_code.append("    const allocator = testing.allocator;")
-        zig_code.append("")
-        zig_code.append("    // Read and parse the JSON test file")
-        zig_code.append(f'    const json_path = "{json_rel_path}";')
-        zig_code.append("    const json_content = try std.fs.cwd().readFileAlloc(allocator, json_path, 100 * 1024 * 1024);")
-        zig_code.append("    defer allocator.free(json_content);")
-        zig_code.append("")
-        zig_code.append("    const parsed = try std.json.parseFromSlice(std.json.Value, allocator, json_content, .{});")
-        zig_code.append("    defer parsed.deinit();")
-        zig_code.append("")
-        zig_code.append("    // Get the specific test case")
-        zig_code.append(f'    const test_case = parsed.value.object.get("{test_name}") orelse return error.TestNotFound;')
-        zig_code.append("")
-        zig_code.append("    // Run the test with path for trace generation")
-        zig_code.append("    try runner.runJsonTestWithPath(allocator, test_case, json_path);")
-        zig_code.append("}")
-        zig_code.append("")
+        zig_code.append(ZIG_TEST_TEMPLATE.format(
+            unique_test_name=unique_test_name,
+            json_path=zig_json_path,
+            test_name=test_name.translate(ZIG_STRING_ESCAPES),
+        ))
         test_count += 1
 
     # Write the Zig file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(zig_code))
+    write_file(output_file, "".join(zig_code).encode("utf-8"))
 
     return test_count
 
 
+def iter_json_files(root: Path) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (path, depth) for all JSON files under root, where depth is the number
+    of directories between root and the file.
+
+    Walks with os.scandir so file type checks come from the directory entry
+    instead of a stat call per file.
+    """
+    stack = [(os.fspath(root), 0)]
+    while stack:
+        path, depth = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((entry.path, depth + 1))
+            elif entry.name.endswith(".json"):
+                yield entry.path, depth
+
+
 def scan_test_directory(
     base_path: Path,
     source_name: str,
     repo_root: Path
-) -> List[Tuple[Path, str]]:
+) -> List[Tuple[Path, str, int]]:
     """
-    Scan a test directory and return list of (json_file_path, relative_path_from_repo_root).
+    Scan a test directory and return list of
+    (json_file_path, relative_path_from_repo_root, output_depth), where
+    output_depth is the number of path components of the generated Zig file.
     """
     if not base_path.exists():
         print(f"Warning: Test directory not found: {base_path}", file=sys.stderr)
         return []
 
-    json_files = []
-    for json_file in base_path.rglob("*.json"):
-        # Get path relative to repo root for the JSON file
-        if source_name == "execution_specs":
-            # For execution-specs, path from repo root is execution-specs/tests/eest/...
-            rel_path = str(json_file.relative_to(repo_root))
-        else:
-            # For ethereum-tests, path from repo root is ethereum-tests/GeneralStateTests/...
-            rel_path = str(json_file.relative_to(repo_root))
-
-        json_files.append((json_file, rel_path))
-
-    return json_files
+    # For execution-specs, path from repo root is execution-specs/tests/eest/...
+    # For ethereum-tests, path from repo root is ethereum-tests/GeneralStateTests/...
+    base_rel_path = os.path.relpath(base_path, repo_root)
+    # output_rel_path() nests the output one level deeper for ethereum-tests;
+    # the extra 1 accounts for the file itself
+    base_depth = len(Path(output_rel_path(base_rel_path, source_name)).parts) + 1
+    return [
+        (Path(json_file), os.path.relpath(json_file, repo_root), base_depth + depth)
+        for json_file, depth in iter_json_files(base_path)
+    ]
 
 
 def ensure_general_state_tests(repo_root: Path) -> None:
     fixtures_dir = repo_root / "ethereum-tests" / "GeneralStateTests"
+    archive_path = repo_root / "ethereum-tests" / "fixtures_general_state_tests.tgz"
     if fixtures_dir.exists():
-        return
+        if archive_unchanged(fixtures_dir, archive_path):
+            return
+        print(f"{archive_path} changed since it was extracted")
+        shutil.rmtree(fixtures_dir)
 
-    archive_path = repo_root / "ethereum-tests" / "fixtures_general_state_tests.tgz"
     if not archive_path.exists():
         print(
             f"Warning: GeneralStateTests fixtures not found at {fixtures_dir} or {archive_path}",
@@ -166,6 +436,8 @@ def ensure_general_state_tests(repo_root: Path) -> None:
     print(f"Extracting {archive_path} -> {fixtures_dir}")
     with tarfile.open(archive_path, "r:gz") as archive:
         archive.extractall(path=repo_root / "ethereum-tests")
+    if fixtures_dir.is_dir():
+        write_archive_sentinel(fixtures_dir, archive_path)
 
 
 def main():
@@ -190,11 +462,14 @@ def main():
 
     output_root = repo_root / "test" / "specs" / "generated"
 
-    # Clean output directory
-    if output_root.exists():
-        import shutil
-        shutil.rmtree(output_root)
+    # Reuse outputs of unchanged fixtures; without a usable manifest, start clean
+    manifest_path = output_root / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    remover = None
+    if not manifest and output_root.exists():
+        remover = discard_tree(output_root)
     output_root.mkdir(parents=True, exist_ok=True)
+    fixtures: Dict[str, list] = {}
 
     print("=" * 80)
     print("ETHEREUM TEST GENERATOR")
@@ -222,20 +497,70 @@ def main():
             continue
 
         print(f"  Found {len(json_files)} JSON test files")
-        print(f"  Generating test files...")
 
         source_file_count = 0
         source_test_count = 0
 
-        # Generate test files
-        for i, (json_file, rel_path) in enumerate(json_files, 1):
-            if i % 100 == 0:
-                print(f"  Progress: {i}/{len(json_files)} files...")
+        entries = [
+            (output_rel_path(rel_path, source_name), json_file, file_stamp(json_file))
+            for json_file, rel_path, _ in json_files
+        ]
+        # Fixtures with identical content only get a stand-in file importing the first one
+        duplicates, digests = find_duplicate_fixtures(entries, manifest)
+
+        # Skip fixtures whose mtime and size match the previous run
+        pending = []
+        for (zig_rel_path, json_file, stamp), (_, rel_path, depth) in zip(entries, json_files):
+            cached = manifest.pop(zig_rel_path, None)
+            if zig_rel_path in duplicates:
+                fixtures[zig_rel_path] = stamp + [digests.get(zig_rel_path)]
+                continue
+            if (
+                cached is not None
+                and cached[:2] == stamp
+                and len(cached) == 4
+                # Fixtures without tests may have no output file
+                and (cached[3] == 0 or (output_root / zig_rel_path).exists())
+            ):
+                fixtures[zig_rel_path] = stamp + [digests.get(zig_rel_path), cached[3]]
+                if cached[3] > 0:
+                    source_file_count += 1
+                    source_test_count += cached[3]
+            else:
+                pending.append((json_file, rel_path, zig_rel_path, stamp, depth))
+
+        if len(pending) + len(duplicates) < len(json_files):
+            print(f"  Skipping {len(json_files) - len(pending) - len(duplicates)} unchanged test files")
+        print(f"  Generating test files...")
 
-            test_count = generate_test_file(json_file, output_root, rel_path, source_name)
-            if test_count > 0:
-                source_file_count += 1
-                source_test_count += test_count
+        # Generate test files; fixtures are independent, so spread them across cores
+        with ProcessPoolExecutor() as executor:
+            test_counts = executor.map(
+                generate_test_file,
+                [json_file for json_file, _, _, _, _ in pending],
+                repeat(output_root),
+                [rel_path for _, rel_path, _, _, _ in pending],
+                repeat(source_name),
+                [depth for _, _, _, _, depth in pending],
+                chunksize=32,
+            )
+            for i, ((_, _, zig_rel_path, stamp, _), test_count) in enumerate(zip(pending, test_counts), 1):
+                if i % 100 == 0:
+                    print(f"  Progress: {i}/{len(pending)} files...")
+
+                fixtures[zig_rel_path] = stamp + [digests.get(zig_rel_path), test_count]
+                if test_count > 0:
+                    source_file_count += 1
+                    source_test_count += test_count
+
+        for zig_rel_path, canonical in duplicates.items():
+            if (output_root / canonical).exists():
+                write_duplicate_file(output_root, zig_rel_path, canonical)
+            else:
+                (output_root / zig_rel_path).unlink(missing_ok=True)
+            fixtures[zig_rel_path] = fixtures[zig_rel_path] + [0, canonical]
+        if duplicates:
+            print(f"  Linked {len(duplicates)} duplicate test files")
 
         print(f"  ✓ Generated {source_file_count} test files with {source_test_count} test cases")
         print()
@@ -244,6 +569,13 @@ def main():
         total_files += source_file_count
         total_tests += source_test_count
 
+    # Whatever is left in the manifest belongs to fixtures that no longer exist
+    for zig_rel_path in manifest:
+        (output_root / zig_rel_path).unlink(missing_ok=True)
+    save_manifest(manifest_path, fixtures)
+    if remover is not None:
+        remover.join()
+
     # Print summary
     print("=" * 80)
     print("GENERATION COMPLETE")